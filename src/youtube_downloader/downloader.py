@@ -11,22 +11,42 @@ License: MIT License (see LICENSE file for details)
 =========================================================================================================
 
 Description:
-Core download logic using pytube with progress callbacks and robust error handling.
+Core download logic using yt-dlp with progress callbacks and robust error handling.
 """
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Callable, List, Optional
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
 
-from pytube import YouTube
-from pytube.exceptions import PytubeError
+from .utils import drop_page_cache, ensure_directory, extract_video_id, sanitize_filename
 
-from .utils import sanitize_filename
+# yt-dlp, httpx (via .transfer) and diskcache are imported on first use so that
+# importing this module stays cheap for scripts and tests that never hit the network.
+if TYPE_CHECKING:
+    from diskcache import Cache
+    from yt_dlp import YoutubeDL
 
+_META_TTL = 24 * 60 * 60  # seconds
+_META_CACHE_DIR = Path.home() / ".cache" / "ytdl_meta"
+_YDL_OPTS: Dict[str, Any] = {"quiet": True, "no_warnings": True, "skip_download": True}
+_ydl: Optional[YoutubeDL] = None
+_ydl_lock = threading.Lock()
+_URL_LIFETIME = 6 * 60 * 60  # seconds; googlevideo's usual signed-URL lifetime
+_URL_EXPIRY_MARGIN = 10 * 60  # seconds; leave room to finish a download
+_INFO_CACHE_SIZE = 32
+_info_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_info_lock = threading.Lock()
+# yt-dlp extensions whose MIME subtype differs from the extension itself.
+_MIME_SUBTYPES = {"m4a": "mp4", "3gp": "3gpp", "mp3": "mpeg", "mkv": "x-matroska"}
 
-@dataclass(frozen=True)
-class StreamInfo:
+
+class StreamInfo(NamedTuple):
     itag: int
     type: str                # "video" | "audio"
     mime_type: str
@@ -36,6 +56,183 @@ class StreamInfo:
     pretty: str              # Human-readable label
 
 
+def _extract_info(url: str) -> Dict[str, Any]:
+    """One yt-dlp extraction returns metadata and every format (with URLs) together."""
+    global _ydl
+    from yt_dlp import YoutubeDL
+
+    # A single long-lived YoutubeDL keeps its HTTP handlers (and their keep-alive
+    # connections) plus the player/signature caches warm between extractions.
+    with _ydl_lock:
+        if _ydl is None:
+            _ydl = YoutubeDL(_YDL_OPTS)
+        return _ydl.extract_info(url, download=False)
+
+
+def _info_expires_at(info: Dict[str, Any]) -> float:
+    """Return when the signed format URLs in `info` stop working (epoch seconds).
+
+    googlevideo URLs carry an `expire=` query parameter; the earliest one wins. Without it,
+    assume the usual lifetime counted from yt-dlp's extraction time (`epoch`).
+    """
+    expiries = []
+    for f in info.get("formats") or []:
+        expire = parse_qs(urlsplit(f.get("url") or "").query).get("expire")
+        if expire and expire[0].isdigit():
+            expiries.append(int(expire[0]))
+    if expiries:
+        return float(min(expiries))
+    return float(info.get("epoch") or 0) + _URL_LIFETIME
+
+
+def _info_is_stale(info: Dict[str, Any], now: Optional[float] = None) -> bool:
+    """True once the format URLs are expired or about to (within _URL_EXPIRY_MARGIN)."""
+    now = time.time() if now is None else now
+    return now >= _info_expires_at(info) - _URL_EXPIRY_MARGIN
+
+
+def _load_info(video_id: str) -> Dict[str, Any]:
+    """Extract once per video ID; reused across downloader instances until its URLs expire."""
+    with _info_lock:
+        info = _info_cache.get(video_id)
+        if info is not None and not _info_is_stale(info):
+            _info_cache.move_to_end(video_id)
+            return info
+    info = _extract_info(f"https://www.youtube.com/watch?v={video_id}")
+    with _info_lock:
+        _info_cache[video_id] = info
+        _info_cache.move_to_end(video_id)
+        while len(_info_cache) > _INFO_CACHE_SIZE:
+            _info_cache.popitem(last=False)
+    return info
+
+
+def _has(codec: Optional[str]) -> bool:
+    return bool(codec) and codec != "none"
+
+
+def _probe_filesizes(formats: List[Dict[str, Any]]) -> List[Optional[int]]:
+    """Return each format's size, HEAD-probing only those yt-dlp left blank."""
+    sizes: List[Optional[int]] = []
+    missing: List[int] = []
+    for i, f in enumerate(formats):
+        size = f.get("filesize") or f.get("filesize_approx")
+        sizes.append(int(size) if size else None)
+        if not size and f.get("url"):
+            missing.append(i)
+    if missing:
+        from .transfer import content_lengths
+
+        # All probes go out at once on the shared client instead of one thread each.
+        probed = content_lengths(
+            [(formats[i]["url"], formats[i].get("http_headers")) for i in missing]
+        )
+        for i, size in zip(missing, probed):
+            sizes[i] = size
+    return sizes
+
+
+def _mime_type(kind: str, ext: Optional[str]) -> str:
+    """Map a yt-dlp extension to a MIME type, e.g. ("audio", "m4a") -> "audio/mp4"."""
+    ext = ext or "mp4"
+    return f"{kind}/{_MIME_SUBTYPES.get(ext, ext)}"
+
+
+def _build_stream_infos(formats: List[Dict[str, Any]]) -> List[StreamInfo]:
+    """Describe video formats (progressive/adaptive) followed by audio-only formats."""
+    # Single pass: drop non-itag formats and classify each format once.
+    videos: List[Dict[str, Any]] = []
+    audios: List[Dict[str, Any]] = []
+    for f in formats:
+        # YouTube itags are numeric; skip storyboards and synthetic ids such as "251-drc".
+        if not str(f.get("format_id", "")).isdigit():
+            continue
+        if _has(f.get("vcodec")):
+            videos.append(f)
+        elif _has(f.get("acodec")):
+            audios.append(f)
+    # sort() evaluates each key once; both are plain numbers, no string parsing.
+    videos.sort(key=lambda f: f.get("height") or 0, reverse=True)
+    audios.sort(key=lambda f: f.get("abr") or 0, reverse=True)
+
+    sizes = _probe_filesizes(videos + audios)
+
+    infos: List[StreamInfo] = []
+
+    # Video (progressive contains both audio+video)
+    for f, size in zip(videos, sizes):
+        res = f"{f['height']}p" if f.get("height") else "N/A"
+        progressive = _has(f.get("acodec"))
+        mime = _mime_type("video", f.get("ext"))
+        infos.append(
+            StreamInfo(
+                itag=int(f["format_id"]),
+                type="video",
+                mime_type=mime,
+                resolution_or_abr=res,
+                progressive=progressive,
+                filesize=size,
+                pretty=f"VIDEO | {res} | {'progressive' if progressive else 'adaptive'} | {mime}",
+            )
+        )
+
+    # Audio only
+    for f, size in zip(audios, sizes[len(videos):]):
+        abr = f"{round(f['abr'])}kbps" if f.get("abr") else "N/A"
+        mime = _mime_type("audio", f.get("audio_ext") or f.get("ext"))
+        infos.append(
+            StreamInfo(
+                itag=int(f["format_id"]),
+                type="audio",
+                mime_type=mime,
+                resolution_or_abr=abr,
+                progressive=False,
+                filesize=size,
+                pretty=f"AUDIO | {abr} | {mime}",
+            )
+        )
+
+    return infos
+
+
+@lru_cache(maxsize=None)
+def _meta_cache() -> Cache:
+    from diskcache import Cache
+
+    return Cache(str(_META_CACHE_DIR))
+
+
+def _load_metadata(video_id: str) -> Tuple[str, List[dict]]:
+    """Return (title, serialized stream infos); cached on disk for a day."""
+    key = ("metadata", video_id)
+    # The disk cache is only an optimization: an unwritable HOME or a locked/corrupt
+    # database is treated as a miss rather than failing the fetch.
+    try:
+        cached = _meta_cache().get(key)
+    except Exception:
+        cached = None
+    if cached is not None:
+        return cached
+    info = _load_info(video_id)
+    title = info.get("title") or video_id
+    result = (title, [si._asdict() for si in _build_stream_infos(info.get("formats") or [])])
+    try:
+        _meta_cache().set(key, result, expire=_META_TTL)
+    except Exception:
+        pass
+    return result
+
+
+def clear_metadata_cache() -> None:
+    """Drop both the on-disk metadata cache and the in-memory extraction results."""
+    try:
+        _meta_cache().clear()
+    except Exception:
+        pass
+    with _info_lock:
+        _info_cache.clear()
+
+
 class YouTubeDownloader:
     """Encapsulates loading streams and downloading with progress reporting."""
 
@@ -47,76 +244,60 @@ class YouTubeDownloader:
         """
         self.url = url.strip()
         self.on_progress = on_progress
-        self._yt: Optional[YouTube] = None
-
-    def _pytube_progress(self, stream, chunk: bytes, bytes_remaining: int):
-        total = stream.filesize or 0
-        received = max(total - bytes_remaining, 0)
-        if self.on_progress:
-            self.on_progress(received, total)
+        self._video_id = extract_video_id(self.url)
+        self._info: Optional[Dict[str, Any]] = None
+        self._title: Optional[str] = None
+        self._infos: Optional[List[StreamInfo]] = None
+        self._itag_index: Optional[Dict[int, Dict[str, Any]]] = None
 
-    def _pytube_complete(self, stream, file_path: str):
-        # No-op hook; GUI handles completion message
-        pass
+    def _ydl_progress(self, d: Dict[str, Any]) -> None:
+        if d.get("status") != "downloading" or not self.on_progress:
+            return
+        total = d.get("total_bytes") or d.get("total_bytes_estimate") or 0
+        self.on_progress(d.get("downloaded_bytes") or 0, int(total))
 
     def load(self) -> None:
-        """Initialize the YouTube object."""
+        """Load title and stream metadata, from the disk cache when possible."""
         try:
-            self._yt = YouTube(
-                self.url,
-                on_progress_callback=self._pytube_progress,
-                on_complete_callback=self._pytube_complete,
-                use_oauth=False,
-                allow_oauth_cache=True,
-            )
-        except Exception as ex:  # keep broad for pytube’s varying exceptions
-            raise RuntimeError(f"Failed to initialize YouTube object: {ex}") from ex
+            if self._video_id:
+                self._title, raw = _load_metadata(self._video_id)
+                self._infos = [StreamInfo(**d) for d in raw]
+            else:
+                self._title = self._extracted().get("title") or self.url
+        except RuntimeError:
+            raise
+        except Exception as ex:  # keep broad for yt-dlp’s varying exceptions
+            raise RuntimeError(f"Failed to load video info: {ex}") from ex
+
+    def _extracted(self) -> Dict[str, Any]:
+        """Return the yt-dlp info dict, extracting when first needed or once its URLs expire."""
+        if self._info is not None and _info_is_stale(self._info):
+            # Long-lived instances (e.g. the GUI's per-video LRU) must not reuse dead URLs.
+            self._info = None
+            self._itag_index = None
+        if self._info is None:
+            try:
+                if self._video_id:
+                    self._info = _load_info(self._video_id)
+                else:
+                    self._info = _extract_info(self.url)
+            except Exception as ex:  # keep broad for yt-dlp’s varying exceptions
+                raise RuntimeError(f"Failed to load video info: {ex}") from ex
+        return self._info
 
     @property
     def title(self) -> str:
-        if not self._yt:
-            raise RuntimeError("YouTube object not loaded. Call load() first.")
-        return self._yt.title
+        if self._title is None:
+            raise RuntimeError("Video info not loaded. Call load() first.")
+        return self._title
 
     def available_streams(self) -> List[StreamInfo]:
         """Return available streams (video progressive/adaptive + audio)."""
-        if not self._yt:
-            raise RuntimeError("YouTube object not loaded. Call load() first.")
-
-        infos: List[StreamInfo] = []
-
-        # Video (progressive contains both audio+video)
-        for s in self._yt.streams.filter(type="video").order_by("resolution").desc():
-            res = getattr(s, "resolution", None) or "N/A"
-            progressive = bool(getattr(s, "is_progressive", False))
-            infos.append(
-                StreamInfo(
-                    itag=s.itag,
-                    type="video",
-                    mime_type=s.mime_type or "video/mp4",
-                    resolution_or_abr=res,
-                    progressive=progressive,
-                    filesize=getattr(s, "filesize", None),
-                    pretty=f"VIDEO | {res} | {'progressive' if progressive else 'adaptive'} | {s.mime_type}",
-                )
-            )
-
-        # Audio only
-        for s in self._yt.streams.filter(only_audio=True).order_by("abr").desc():
-            abr = getattr(s, "abr", None) or "N/A"
-            infos.append(
-                StreamInfo(
-                    itag=s.itag,
-                    type="audio",
-                    mime_type=s.mime_type or "audio/mp4",
-                    resolution_or_abr=abr,
-                    progressive=False,
-                    filesize=getattr(s, "filesize", None),
-                    pretty=f"AUDIO | {abr} | {s.mime_type}",
-                )
-            )
-
-        return infos
+        if self._title is None:
+            raise RuntimeError("Video info not loaded. Call load() first.")
+        if self._infos is None:
+            self._infos = _build_stream_infos(self._extracted().get("formats") or [])
+        return list(self._infos)
 
     def download(self, itag: int, output_dir: str) -> str:
         """Download a selected stream by itag to the output directory.
@@ -124,20 +305,71 @@ class YouTubeDownloader:
         Returns:
             Path to the downloaded file.
         """
-        if not self._yt:
-            raise RuntimeError("YouTube object not loaded. Call load() first.")
+        if self._title is None:
+            raise RuntimeError("Video info not loaded. Call load() first.")
 
-        stream = self._yt.streams.get_by_itag(itag)
-        if stream is None:
+        info = self._extracted()
+        if self._itag_index is None:
+            self._itag_index = {
+                int(f["format_id"]): f
+                for f in info.get("formats") or []
+                if str(f.get("format_id", "")).isdigit()
+            }
+        if itag not in self._itag_index:
             raise ValueError(f"No stream found for itag={itag}")
 
-        safe_title = sanitize_filename(self._yt.title)
+        fmt = self._itag_index[itag]
+        safe_title = sanitize_filename(self.title)
+        if fmt.get("protocol") in ("http", "https") and fmt.get("url"):
+            return self._download_direct(fmt, output_dir, safe_title)
+
+        from yt_dlp import YoutubeDL
+        from yt_dlp.utils import DownloadError
+
+        opts = {
+            "quiet": True,
+            "no_warnings": True,
+            "noprogress": True,
+            "format": str(itag),
+            "paths": {"home": output_dir},
+            "outtmpl": f"{safe_title}.%(ext)s",
+            "progress_hooks": [self._ydl_progress],
+        }
         try:
-            # pytube handles filename; we provide a safe base
-            filepath = stream.download(output_path=output_dir, filename_prefix="")
-        except PytubeError as ex:
-            raise RuntimeError(f"pytube error: {ex}") from ex
+            with YoutubeDL(opts) as ydl:
+                # Reuse the extracted info instead of re-fetching the watch page;
+                # sanitize_info hands yt-dlp a copy so the cached dict stays untouched.
+                result = ydl.process_ie_result(ydl.sanitize_info(info), download=True)
+        except DownloadError as ex:
+            raise RuntimeError(f"yt-dlp error: {ex}") from ex
         except Exception as ex:
             raise RuntimeError(f"Unexpected download error: {ex}") from ex
 
+        downloads = result.get("requested_downloads") or [{}]
+        fallback = Path(output_dir) / f"{safe_title}.{result.get('ext')}"
+        filepath = downloads[0].get("filepath") or str(fallback)
+        try:
+            with open(filepath, "rb") as f:
+                drop_page_cache(f.fileno())
+        except OSError:
+            pass
         return filepath
+
+    def _download_direct(self, fmt: Dict[str, Any], output_dir: str, safe_title: str) -> str:
+        """Fetch a plain HTTP(S) format ourselves with parallel ranges instead of via yt-dlp."""
+        import httpx
+
+        from .transfer import fetch_to_file
+
+        dest = ensure_directory(output_dir) / f"{safe_title}.{fmt.get('ext') or 'mp4'}"
+        part = dest.with_name(dest.name + ".part")
+        try:
+            fetch_to_file(fmt["url"], part, fmt.get("http_headers"), self.on_progress)
+            part.replace(dest)
+        except httpx.HTTPError as ex:
+            part.unlink(missing_ok=True)
+            raise RuntimeError(f"HTTP error: {ex}") from ex
+        except Exception as ex:
+            part.unlink(missing_ok=True)
+            raise RuntimeError(f"Unexpected download error: {ex}") from ex
+        return str(dest)
@@ -11,7 +11,7 @@ License: MIT License (see LICENSE file for details)
 =========================================================================================================
 
 Description:
-Tkinter GUI application for downloading YouTube videos using pytube.
+Tkinter GUI application for downloading YouTube videos using yt-dlp.
 Features:
 - URL validation
 - Fetch & select stream (resolution/bitrate)
@@ -24,13 +24,22 @@ from __future__ import annotations
 
 import threading
 import tkinter as tk
+from collections import OrderedDict
+from queue import Empty, Queue, SimpleQueue
 from tkinter import filedialog, messagebox, ttk
-from typing import Optional
+from typing import Any, Callable, Optional
 
-from .downloader import YouTubeDownloader, StreamInfo
-from .utils import ensure_directory, is_probable_youtube_url
+from .downloader import YouTubeDownloader, StreamInfo, clear_metadata_cache
+from .utils import ensure_directory, extract_video_id, is_probable_youtube_url
 from . import __version__
 
+_PROGRESS_POLL_MS = 33  # progress redraw interval (~30 Hz)
+_MAX_REMEMBERED_VIDEOS = 32
+_WORKER_THREADS = 2
+
+# on_done(result, error) for work run on the background threads
+_DoneCallback = Callable[[Any, Optional[Exception]], None]
+
 
 class App(tk.Tk):
     def __init__(self):
@@ -40,16 +49,33 @@ class App(tk.Tk):
         self.minsize(660, 380)
 
         self._downloader: Optional[YouTubeDownloader] = None
+        self._downloader_by_id: OrderedDict[str, YouTubeDownloader] = OrderedDict()
+        self._fetch_seq: int = 0
+        self._closed: bool = False
+        # Long-lived daemon workers: closing the window never waits on a running transfer.
+        self._tasks: Queue[tuple[Callable[..., Any], tuple, _DoneCallback]] = Queue()
+        for i in range(_WORKER_THREADS):
+            threading.Thread(target=self._worker_loop, name=f"ytdl-{i}", daemon=True).start()
         self._streams: list[StreamInfo] = []
         self._selected_itag: Optional[int] = None
         self._total_bytes: int = 0
+        self._last_pct: int = -1
+        self._progress_q: SimpleQueue[int] = SimpleQueue()
 
         self._build_ui()
+        self._drain_progress()
 
     # ---------------------- UI ----------------------
     def _build_ui(self):
         pad = {"padx": 10, "pady": 6}
 
+        # Menu
+        menubar = tk.Menu(self)
+        cache_menu = tk.Menu(menubar, tearoff=False)
+        cache_menu.add_command(label="Invalidate cache", command=self.on_clear_cache)
+        menubar.add_cascade(label="Cache", menu=cache_menu)
+        self.config(menu=menubar)
+
         frm = ttk.Frame(self)
         frm.pack(fill=tk.BOTH, expand=True)
 
@@ -104,32 +130,79 @@ class App(tk.Tk):
         if folder:
             self.out_var.set(folder)
 
+    def on_clear_cache(self):
+        try:
+            clear_metadata_cache()
+            self._downloader_by_id.clear()
+        except Exception as ex:
+            messagebox.showerror("Cache Error", str(ex))
+            return
+        self.status.config(text="Metadata cache cleared.")
+
     def on_fetch_streams(self):
         url = self.url_var.get().strip()
         if not is_probable_youtube_url(url):
             messagebox.showerror("Invalid URL", "Please paste a valid YouTube video URL.")
             return
 
-        self.set_busy(True, "Loading video info…")
-        self.progress["value"] = 0
-        self.progress_label.config(text="0%")
+        self._reset_progress()
         self.download_btn.config(state=tk.DISABLED)
         self.streams_cmb.set("")
         self.streams_cmb["values"] = []
 
-        def task():
-            try:
-                self._downloader = YouTubeDownloader(url, on_progress=self.on_progress)
-                self._downloader.load()
-                self._streams = self._downloader.available_streams()
-                options = [s.pretty for s in self._streams]
-                self.after(0, lambda: self._populate_streams(options))
-            except Exception as ex:
-                self.after(0, lambda: messagebox.showerror("Fetch Error", str(ex)))
-            finally:
-                self.after(0, lambda: self.set_busy(False, "Ready."))
+        video_id = extract_video_id(url)
+        cached = self._downloader_by_id.get(video_id) if video_id else None
+        if cached is not None:
+            # Seen recently: streams are already in memory, no need for a worker round-trip.
+            self._downloader_by_id.move_to_end(video_id)
+            self._downloader = cached
+            self._streams = cached.available_streams()
+            self._populate_streams([s.pretty for s in self._streams])
+            return
 
-        threading.Thread(target=task, daemon=True).start()
+        self.set_busy(True, "Loading video info…")
+        self._fetch_seq += 1
+        seq = self._fetch_seq
+        self._submit(
+            self._fetch_task,
+            (seq, url),
+            lambda downloader, error: self._on_fetch_done(seq, video_id, downloader, error),
+        )
+
+    def _fetch_task(self, seq: int, url: str) -> Optional[YouTubeDownloader]:
+        # Runs on a worker thread; UI state is only touched in _on_fetch_done.
+        if seq != self._fetch_seq:
+            return None  # superseded while still queued
+        downloader = YouTubeDownloader(url, on_progress=self.on_progress)
+        downloader.load()
+        downloader.available_streams()
+        return downloader
+
+    def _on_fetch_done(
+        self,
+        seq: int,
+        video_id: Optional[str],
+        downloader: Optional[YouTubeDownloader],
+        error: Optional[Exception],
+    ):
+        if seq != self._fetch_seq:
+            return  # superseded by a newer fetch
+        self.set_busy(False, "Ready.")
+        if error is not None:
+            messagebox.showerror("Fetch Error", str(error))
+            return
+        self._downloader = downloader
+        self._streams = downloader.available_streams()
+        self._remember_downloader(video_id, downloader)
+        self._populate_streams([s.pretty for s in self._streams])
+
+    def _remember_downloader(self, video_id: Optional[str], downloader: YouTubeDownloader):
+        if not video_id:
+            return
+        self._downloader_by_id[video_id] = downloader
+        self._downloader_by_id.move_to_end(video_id)
+        while len(self._downloader_by_id) > _MAX_REMEMBERED_VIDEOS:
+            self._downloader_by_id.popitem(last=False)
 
     def _populate_streams(self, options: list[str]):
         if not options:
@@ -159,26 +232,84 @@ class App(tk.Tk):
             return
 
         self.set_busy(True, "Downloading…")
-        self.progress["value"] = 0
-        self.progress_label.config(text="0%")
+        self._reset_progress()
+
+        self._submit(
+            self._downloader.download,
+            (self._selected_itag, out_dir),
+            self._on_download_done,
+        )
+
+    def _on_download_done(self, path: Optional[str], error: Optional[Exception]):
+        self.set_busy(False, "Ready.")
+        if error is not None:
+            messagebox.showerror("Download Error", str(error))
+            return
+        messagebox.showinfo("Completed", f"Downloaded:\n{path}")
+
+    # ------------------ Background work ------------------
+    def _submit(self, fn: Callable[..., Any], args: tuple, on_done: _DoneCallback):
+        """Queue `fn(*args)` for a worker; `on_done(result, error)` then runs on the Tk thread."""
+        self._tasks.put((fn, args, on_done))
 
-        def task():
+    def _worker_loop(self):
+        while True:
+            fn, args, on_done = self._tasks.get()
             try:
-                path = self._downloader.download(self._selected_itag, out_dir)
-                self.after(0, lambda: messagebox.showinfo("Completed", f"Downloaded:\n{path}"))
+                result, error = fn(*args), None
             except Exception as ex:
-                self.after(0, lambda: messagebox.showerror("Download Error", str(ex)))
-            finally:
-                self.after(0, lambda: self.set_busy(False, "Ready."))
+                result, error = None, ex
+            self._post(on_done, result, error)
 
-        threading.Thread(target=task, daemon=True).start()
+    def _post(self, callback: Callable[..., Any], *args: Any):
+        if self._closed:
+            return
+        try:
+            self.after(0, callback, *args)
+        except (RuntimeError, tk.TclError):
+            pass  # window torn down while the task was running
 
     def on_progress(self, bytes_received: int, total_bytes: int):
+        # Called from the download thread for every chunk; never touch Tk here.
+        # Integer math only, and nothing is queued unless the percentage moved.
         self._total_bytes = total_bytes
-        percent = 0 if total_bytes <= 0 else int((bytes_received / total_bytes) * 100)
+        if total_bytes <= 0:
+            return
+        percent = bytes_received * 100 // total_bytes
+        if percent == self._last_pct:
+            return
+        self._last_pct = percent
+        self._progress_q.put_nowait(percent)
+
+    def _drain_progress(self):
+        # Main-thread poll: apply only the latest queued update, at most ~30 times a second.
+        last = None
+        try:
+            while True:
+                last = self._progress_q.get_nowait()
+        except Empty:
+            pass
+        if last is not None:
+            self._show_progress(last)
+        self.after(_PROGRESS_POLL_MS, self._drain_progress)
+
+    def _show_progress(self, percent: int):
         self.progress["value"] = percent
         self.progress_label.config(text=f"{percent}%")
 
+    def _reset_progress(self):
+        try:
+            while True:
+                self._progress_q.get_nowait()
+        except Empty:
+            pass
+        self._last_pct = -1
+        self._show_progress(0)
+
+    def destroy(self):
+        self._closed = True
+        super().destroy()
+
     def set_busy(self, busy: bool, status: str):
         widgets = [self.fetch_btn, self.browse_btn, self.download_btn, self.url_entry, self.streams_cmb, self.out_entry]
         for w in widgets:
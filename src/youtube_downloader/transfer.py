@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=========================================================================================================
+Project: YouTube Video Downloader
+File: transfer.py
+Author: Mobin Yousefi (GitHub: https://github.com/mobinyousefi-cs)
+Created: 2025-10-05
+Updated: 2025-10-05
+License: MIT License (see LICENSE file for details)
+=========================================================================================================
+
+Description:
+HTTP transfers over one shared, pooled httpx client (HTTP/2) driven by a background event loop:
+content-length probes and parallel byte-range downloads of direct media URLs.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+import httpx
+
+from .utils import drop_page_cache
+
+T = TypeVar("T")
+
+_RANGE_SIZE = 10 * 1024 * 1024  # googlevideo throttles much larger single range requests
+_RANGE_CONNECTIONS = 4
+_READ_CHUNK = 1024 * 1024
+_ADVISE_EVERY = 16 * 1024 * 1024  # bytes written between page-cache drop hints
+_POOL_SIZE = 32
+_RETRIES = 3  # connect retries in the shared transport
+_RANGE_RETRIES = 3  # re-requests of a failed or truncated range
+_RETRY_BACKOFF = 0.5  # seconds, doubled per attempt
+_HTTP_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+_HAS_PWRITE = hasattr(os, "pwrite")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="ytdl-http", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared client; only ever called on the background loop."""
+    global _client
+    if _client is None:
+        limits = httpx.Limits(max_connections=_POOL_SIZE, max_keepalive_connections=_POOL_SIZE)
+        _client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(http2=True, limits=limits, retries=_RETRIES),
+            follow_redirects=True,
+            timeout=_HTTP_TIMEOUT,
+        )
+    return _client
+
+
+def _run(coro: Awaitable[T]) -> T:
+    """Run a coroutine on the shared loop so TCP/TLS connections are reused across calls."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+
+async def _content_length(url: str, headers: Optional[Dict[str, str]]) -> Optional[int]:
+    resp = await _get_client().head(url, headers=headers)
+    resp.raise_for_status()
+    length = resp.headers.get("Content-Length")
+    return int(length) if length else None
+
+
+async def _content_lengths(
+    targets: Sequence[Tuple[str, Optional[Dict[str, str]]]],
+) -> List[Optional[int]]:
+    results = await asyncio.gather(
+        *(_content_length(url, headers) for url, headers in targets), return_exceptions=True
+    )
+    # One failed probe shouldn't sink the batch.
+    return [None if isinstance(r, BaseException) else r for r in results]
+
+
+def _write_at(fd: int, offset: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        if _HAS_PWRITE:
+            n = os.pwrite(fd, view, offset)
+        else:  # Windows: safe because each download has exactly one writer thread
+            os.lseek(fd, offset, os.SEEK_SET)
+            n = os.write(fd, view)
+        view = view[n:]
+        offset += n
+
+
+def _close_after(writer: ThreadPoolExecutor, fd: int) -> None:
+    writer.shutdown(wait=True)
+    os.close(fd)
+
+
+def _sync_and_drop(fd: int) -> None:
+    # One full-file sync at the end, so DONTNEED also covers the pages still dirty.
+    drop_page_cache(fd, sync=True)
+
+
+class _RangesUnsupported(Exception):
+    """The server answered a range request with something other than 206."""
+
+
+def _is_retryable(ex: httpx.HTTPError) -> bool:
+    if isinstance(ex, httpx.HTTPStatusError):
+        return ex.response.status_code >= 500
+    return isinstance(ex, httpx.TransportError)
+
+
+async def _fetch_stream(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Optional[Dict[str, str]],
+    fd: int,
+    on_writer: Callable[..., Awaitable[None]],
+    report: Callable[[int], None],
+) -> None:
+    pos = advised = 0
+    pending: Optional[Awaitable[None]] = None
+    async with client.stream("GET", url, headers=headers) as resp:
+        resp.raise_for_status()
+        async for chunk in resp.aiter_bytes(_READ_CHUNK):
+            # Double-buffer: receive the next chunk while the previous one is written.
+            if pending is not None:
+                await pending
+            pending = on_writer(_write_at, fd, pos, chunk)
+            pos += len(chunk)
+            report(len(chunk))
+            if pos - advised >= 2 * _ADVISE_EVERY:
+                # Advise one window behind: the newest window is most likely still dirty.
+                await pending
+                pending = on_writer(drop_page_cache, fd, advised, _ADVISE_EVERY)
+                advised += _ADVISE_EVERY
+    if pending is not None:
+        await pending
+    await on_writer(os.ftruncate, fd, pos)
+    await on_writer(_sync_and_drop, fd)
+
+
+async def _fetch_ranges(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Optional[Dict[str, str]],
+    total: int,
+    fd: int,
+    on_writer: Callable[..., Awaitable[None]],
+    report: Callable[[int], None],
+) -> None:
+    await on_writer(os.ftruncate, fd, total)
+    ranges = deque(
+        (start, min(start + _RANGE_SIZE, total) - 1) for start in range(0, total, _RANGE_SIZE)
+    )
+
+    async def fetch_range(start: int, end: int) -> None:
+        pos = start
+        attempt = 0
+        while True:
+            # Each attempt resumes from the first byte not yet written.
+            range_headers = {**(headers or {}), "Range": f"bytes={pos}-{end}"}
+            try:
+                async with client.stream("GET", url, headers=range_headers) as resp:
+                    resp.raise_for_status()
+                    if resp.status_code != 206:
+                        raise _RangesUnsupported(f"range request answered with {resp.status_code}")
+                    async for chunk in resp.aiter_bytes(_READ_CHUNK):
+                        await on_writer(_write_at, fd, pos, chunk)
+                        pos += len(chunk)
+                        report(len(chunk))
+                if pos > end:
+                    break
+                raise httpx.ReadError(f"Incomplete range bytes={start}-{end}")
+            except httpx.HTTPError as ex:
+                if attempt >= _RANGE_RETRIES or not _is_retryable(ex):
+                    raise
+            await asyncio.sleep(_RETRY_BACKOFF * 2**attempt)
+            attempt += 1
+
+    async def worker() -> None:
+        previous: Optional[Tuple[int, int]] = None
+        while ranges:
+            start, end = ranges.popleft()
+            await fetch_range(start, end)
+            # Advise one range behind; writeback has usually cleaned it by now.
+            if previous is not None:
+                await on_writer(drop_page_cache, fd, *previous)
+            previous = (start, end - start + 1)
+
+    tasks = [asyncio.ensure_future(worker()) for _ in range(_RANGE_CONNECTIONS)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # Stop sibling ranges before the file is closed underneath them.
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    await on_writer(_sync_and_drop, fd)
+
+
+async def _fetch_to_file(
+    url: str,
+    dest: Path,
+    headers: Optional[Dict[str, str]],
+    on_progress: Optional[Callable[[int, int], None]],
+) -> None:
+    client = _get_client()
+    head = await client.head(url, headers=headers)
+    head.raise_for_status()
+    total = int(head.headers.get("Content-Length") or 0)
+    received = 0
+
+    def report(n: int) -> None:
+        nonlocal received
+        received += n
+        if on_progress:
+            on_progress(received, total)
+
+    loop = asyncio.get_running_loop()
+    # File I/O runs on one dedicated thread per download so the event loop keeps
+    # receiving on every connection while earlier chunks are being written.
+    writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ytdl-write")
+    fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+
+    def on_writer(fn: Callable[..., None], *args: Any) -> Awaitable[None]:
+        return loop.run_in_executor(writer, fn, *args)
+
+    try:
+        if total > 0 and head.headers.get("Accept-Ranges") == "bytes":
+            try:
+                await _fetch_ranges(client, url, headers, total, fd, on_writer, report)
+                return
+            except _RangesUnsupported:
+                received = 0  # advertised ranges but ignored them: start over with one GET
+        await _fetch_stream(client, url, headers, fd, on_writer, report)
+    finally:
+        # Joining the writer blocks, so do it off the shared loop; the fd is closed only
+        # once queued writes are done, even if this await itself gets cancelled.
+        await loop.run_in_executor(None, _close_after, writer, fd)
+
+
+def content_lengths(
+    targets: Sequence[Tuple[str, Optional[Dict[str, str]]]],
+) -> List[Optional[int]]:
+    """HEAD every (url, headers) pair concurrently and return their Content-Lengths in order.
+
+    Requests share the pooled client, so on HTTP/2 hosts they multiplex over one connection.
+    Entries are None where the length is absent or the probe failed.
+    """
+    return _run(_content_lengths(targets))
+
+
+def fetch_to_file(
+    url: str,
+    dest: Path,
+    headers: Optional[Dict[str, str]] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> None:
+    """Download `url` into `dest`, splitting it into byte ranges fetched concurrently.
+
+    Each range is retried (resuming where it stopped) on connection errors and 5xx replies.
+    Falls back to a single streamed GET when the server reports no length or no range support,
+    or answers a range request with the whole body.
+    `on_progress` is invoked from the transfer thread.
+    """
+    _run(_fetch_to_file(url, dest, headers, on_progress))
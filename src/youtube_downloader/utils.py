@@ -16,41 +16,103 @@ Utility helpers for validation, formatting, and safe filename creation.
 
 from __future__ import annotations
 
+import os
 import re
 import string
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional
 
 
-_YT_URL_RE = re.compile(
-    r"""^
-    (?:https?://)?
-    (?:www\.)?
-    (?:youtube\.com/watch\?v=|youtu\.be/)
-    [A-Za-z0-9_\-]{6,}   # video id
-    """,
-    re.VERBOSE,
+_URL_SCHEMES = ("https://", "http://")
+_URL_HOSTS = (
+    "www.youtube.com/watch?v=",
+    "youtube.com/watch?v=",
+    "m.youtube.com/watch?v=",
+    "youtu.be/",
+    "www.youtu.be/",
 )
+_ID_CHARS = frozenset(f"{string.ascii_letters}{string.digits}_-")
+_MIN_ID_LEN = 6
+
+
+def _scan_video_id(url: str) -> Optional[str]:
+    """Single forward scan: optional scheme, known host prefix, then the run of ID chars.
+
+    Only C-level startswith calls on the common path; cheap enough for per-keystroke checks.
+    """
+    s = url.strip()
+    for scheme in _URL_SCHEMES:
+        if s.startswith(scheme):
+            s = s[len(scheme):]
+            break
+    for host in _URL_HOSTS:
+        if s.startswith(host):
+            rest = s[len(host):]
+            break
+    else:
+        return None
+    end = 0
+    while end < len(rest) and rest[end] in _ID_CHARS:
+        end += 1
+    return rest[:end] if end >= _MIN_ID_LEN else None
 
 
 def is_probable_youtube_url(url: str) -> bool:
     """Quick heuristic validation for YouTube watch/short URLs."""
     if not isinstance(url, str):
         return False
-    url = url.strip()
-    return bool(_YT_URL_RE.match(url))
+    return _scan_video_id(url) is not None
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    """Return the video ID of a YouTube watch/short URL, or None if it isn't one."""
+    if not isinstance(url, str):
+        return None
+    return _scan_video_id(url)
+
+
+# Runs of anything outside "-_.() " and ASCII letters/digits collapse to a single "_".
+_UNSAFE_RUN_RE = re.compile(r"[^-_.() A-Za-z0-9]+")
 
 
 def sanitize_filename(name: str, max_len: int = 180) -> str:
     """Make a filesystem-safe filename."""
-    allowed = f"-_.() {string.ascii_letters}{string.digits}"
-    cleaned = "".join(c if c in allowed else "_" for c in name).strip(" ._")
+    cleaned = _UNSAFE_RUN_RE.sub("_", name).strip(" ._")
     if len(cleaned) > max_len:
         cleaned = cleaned[: max_len - 3] + "..."
     return cleaned or "video"
 
 
+@lru_cache(maxsize=128)
+def _resolve_directory(path_str: str) -> Path:
+    return Path(path_str).expanduser().resolve()
+
+
 def ensure_directory(path: str | Path) -> Path:
-    """Create directory if missing and return Path."""
-    p = Path(path).expanduser().resolve()
+    """Create directory if missing and return Path.
+
+    Only the resolved path is memoized; mkdir runs every time because the folder may have
+    been deleted since the last call.
+    """
+    p = _resolve_directory(str(path))
     p.mkdir(parents=True, exist_ok=True)
     return p
+
+
+def drop_page_cache(fd: int, offset: int = 0, length: int = 0, *, sync: bool = False) -> None:
+    """Hint that the given byte range of `fd` won't be read again soon.
+
+    DONTNEED skips dirty pages, so without `sync` only data already written back is dropped.
+    `sync=True` runs a full-file fdatasync first; do that once per file, not per chunk.
+    Best effort: the kernel may keep the pages anyway. No-op where posix_fadvise is
+    unavailable (Windows, macOS).
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        if sync:
+            os.fdatasync(fd)
+        os.posix_fadvise(fd, offset, length, os.POSIX_FADV_DONTNEED)
+    except OSError:
+        pass
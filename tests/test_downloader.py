@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for downloader helpers that don't need the network.
+"""
+
+import time
+
+from youtube_downloader import downloader
+
+
+def _info(expire=None, epoch=None):
+    url = "https://rr1.googlevideo.com/videoplayback?itag=18"
+    if expire is not None:
+        url += f"&expire={expire}"
+    info = {"formats": [{"format_id": "18", "url": url}]}
+    if epoch is not None:
+        info["epoch"] = epoch
+    return info
+
+
+def test_info_is_stale_uses_expire_param():
+    now = 1_700_000_000
+    assert not downloader._info_is_stale(_info(expire=now + 3600), now=now)
+    assert downloader._info_is_stale(_info(expire=now + 60), now=now)
+    assert downloader._info_is_stale(_info(expire=now - 1), now=now)
+
+
+def test_info_is_stale_falls_back_to_extraction_time():
+    now = 1_700_000_000
+    assert not downloader._info_is_stale(_info(epoch=now - 60), now=now)
+    assert downloader._info_is_stale(_info(epoch=now - 7 * 60 * 60), now=now)
+
+
+def test_load_info_re_extracts_stale_entries(monkeypatch):
+    calls = []
+
+    def fake_extract(url):
+        calls.append(url)
+        return _info(expire=int(time.time()) + (3600 if len(calls) > 1 else 0))
+
+    monkeypatch.setattr(downloader, "_extract_info", fake_extract)
+    monkeypatch.setattr(downloader, "_info_cache", downloader.OrderedDict())
+    downloader._load_info("abcdefghijk")  # already expired on arrival
+    fresh = downloader._load_info("abcdefghijk")
+    assert downloader._load_info("abcdefghijk") is fresh
+    assert len(calls) == 2
+
+
+def test_downloader_refreshes_stale_info(monkeypatch):
+    infos = iter([_info(expire=int(time.time()) - 1), _info(expire=int(time.time()) + 3600)])
+    monkeypatch.setattr(downloader, "_load_info", lambda video_id: next(infos))
+    dl = downloader.YouTubeDownloader("https://youtu.be/abcdefghijk")
+    stale = dl._extracted()
+    fresh = dl._extracted()
+    assert fresh is not stale
+    assert dl._extracted() is fresh
+
+
+def _fmt(format_id, vcodec="none", acodec="none", **extra):
+    # No "url": sizes come from the dict, so nothing is probed over the network.
+    return {"format_id": format_id, "vcodec": vcodec, "acodec": acodec, **extra}
+
+
+def test_build_stream_infos_classifies_and_sorts():
+    formats = [
+        _fmt("sb0", ext="mhtml"),
+        _fmt("251-drc", acodec="opus", abr=130, ext="webm"),
+        _fmt("140", acodec="mp4a.40.2", abr=129.5, audio_ext="m4a", ext="m4a", filesize=3_000),
+        _fmt("251", acodec="opus", abr=135, audio_ext="webm", ext="webm", filesize_approx=2_000.7),
+        _fmt("18", vcodec="avc1", acodec="mp4a.40.2", height=360, ext="mp4", filesize=5_000),
+        _fmt("137", vcodec="avc1", height=1080, ext="mp4"),
+    ]
+    infos = downloader._build_stream_infos(formats)
+
+    assert [i.itag for i in infos] == [137, 18, 251, 140]
+    assert [i.type for i in infos] == ["video", "video", "audio", "audio"]
+    assert [i.progressive for i in infos] == [False, True, False, False]
+    assert [i.resolution_or_abr for i in infos] == ["1080p", "360p", "135kbps", "130kbps"]
+    assert [i.filesize for i in infos] == [None, 5_000, 2_000, 3_000]
+    assert isinstance(infos[2].filesize, int)
+    assert [i.mime_type for i in infos] == ["video/mp4", "video/mp4", "audio/webm", "audio/mp4"]
+
+
+def _use_meta_cache(monkeypatch, cache_dir):
+    monkeypatch.setattr(downloader, "_META_CACHE_DIR", cache_dir)
+    downloader._meta_cache.cache_clear()
+    calls = []
+
+    def fake_load_info(video_id):
+        calls.append(video_id)
+        return {"title": "Clip", "formats": [_fmt("140", acodec="mp4a.40.2", abr=128, ext="m4a")]}
+
+    monkeypatch.setattr(downloader, "_load_info", fake_load_info)
+    return calls
+
+
+def test_load_uses_disk_cache_until_cleared(monkeypatch, tmp_path):
+    calls = _use_meta_cache(monkeypatch, tmp_path / "meta")
+    try:
+        for _ in range(2):
+            yt = downloader.YouTubeDownloader("https://youtu.be/dQw4w9WgXcQ")
+            yt.load()
+            assert yt.title == "Clip"
+        assert calls == ["dQw4w9WgXcQ"]
+        downloader.clear_metadata_cache()
+        downloader.YouTubeDownloader("https://youtu.be/dQw4w9WgXcQ").load()
+        assert len(calls) == 2
+    finally:
+        downloader._meta_cache().close()
+        downloader._meta_cache.cache_clear()
+
+
+def test_load_survives_unusable_disk_cache(monkeypatch, tmp_path):
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    calls = _use_meta_cache(monkeypatch, blocker / "meta")
+    try:
+        yt = downloader.YouTubeDownloader("https://youtu.be/dQw4w9WgXcQ")
+        yt.load()
+        assert yt.title == "Clip"
+        downloader.clear_metadata_cache()
+        assert calls == ["dQw4w9WgXcQ"]
+    finally:
+        downloader._meta_cache.cache_clear()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for ranged downloads against a local HTTP server.
+"""
+
+import os
+import re
+import select
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from youtube_downloader import transfer
+from youtube_downloader.downloader import YouTubeDownloader
+
+BODY = os.urandom(100_000)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    accept_ranges = True
+    ignore_range = False
+    fail_offset = None  # answer 404 to the range starting here and stall the others
+    stalled: list  # per stalled range: whether the client had hung up by the time it answered
+    flaky = 0  # answer 503 to this many range requests before serving them
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        if self.path != "/video":
+            return self._reply(404, 0)
+        self._reply(200, len(BODY), {"Accept-Ranges": "bytes"} if self.accept_ranges else {})
+
+    def do_GET(self):
+        m = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        if not m or self.ignore_range:
+            self._reply(200, len(BODY))
+            self.wfile.write(BODY)
+            return
+        start, end = int(m[1]), int(m[2])
+        if start == self.fail_offset:
+            return self._reply(404, 0)
+        if self.fail_offset is not None:
+            time.sleep(0.5)
+            type(self).stalled.append(self._peer_closed())
+        if type(self).flaky:
+            type(self).flaky -= 1
+            return self._reply(503, 0)
+        self._reply(206, end - start + 1, {"Content-Range": f"bytes {start}-{end}/{len(BODY)}"})
+        self.wfile.write(BODY[start : end + 1])
+
+    def _peer_closed(self):
+        try:
+            readable, _, _ = select.select([self.connection], [], [], 0.2)
+            return bool(readable) and self.connection.recv(1, socket.MSG_PEEK) == b""
+        except ConnectionError:
+            return True
+
+    def _reply(self, status, length, headers=()):
+        self.send_response(status)
+        self.send_header("Content-Length", str(length))
+        for name, value in dict(headers).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+
+class _Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # cancelled ranges close their connections mid-body
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(transfer, "_RANGE_SIZE", 16_384)
+    monkeypatch.setattr(transfer, "_RETRY_BACKOFF", 0)
+    handler = type("Handler", (_Handler,), {"stalled": []})
+    httpd = _Server(("127.0.0.1", 0), handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield handler, f"http://127.0.0.1:{httpd.server_address[1]}/video"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.mark.parametrize(
+    "config",
+    [{}, {"accept_ranges": False}, {"ignore_range": True}, {"flaky": 2}],
+    ids=["ranges", "no-accept-ranges", "range-ignored", "retried"],
+)
+def test_fetch_to_file_reassembles_body(server, tmp_path, config):
+    handler, url = server
+    for name, value in config.items():
+        setattr(handler, name, value)
+    progress = []
+
+    def on_progress(done, total):
+        progress.append((done, total))
+
+    dest = tmp_path / "video.mp4"
+    transfer.fetch_to_file(url, dest, on_progress=on_progress)
+    assert dest.read_bytes() == BODY
+    assert progress[-1] == (len(BODY), len(BODY))
+    assert handler.flaky == 0
+
+
+def test_content_lengths_keeps_order_when_a_probe_fails(server):
+    _, url = server
+    missing = url.replace("/video", "/missing")
+    assert transfer.content_lengths([(url, None), (missing, None)]) == [len(BODY), None]
+
+
+def test_failed_range_cancels_siblings_and_removes_part(server, tmp_path):
+    handler, url = server
+    handler.fail_offset = 2 * transfer._RANGE_SIZE
+    downloader = YouTubeDownloader("https://youtu.be/dQw4w9WgXcQ")
+    fmt = {"url": url, "ext": "mp4", "protocol": "http"}
+    with pytest.raises(RuntimeError, match="HTTP error"):
+        downloader._download_direct(fmt, str(tmp_path), "video")
+    assert list(tmp_path.iterdir()) == []
+    deadline = time.monotonic() + 5
+    while len(handler.stalled) < transfer._RANGE_CONNECTIONS - 1 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    # Every sibling range was cancelled, closing its connection instead of awaiting the body.
+    assert handler.stalled == [True] * (transfer._RANGE_CONNECTIONS - 1)
+
+
+@pytest.mark.skipif(not hasattr(os, "posix_fadvise"), reason="posix_fadvise unavailable")
+def test_fetch_to_file_syncs_once(server, tmp_path, monkeypatch):
+    _, url = server
+    syncs = []
+    monkeypatch.setattr(os, "fdatasync", syncs.append)
+    transfer.fetch_to_file(url, tmp_path / "video.mp4")
+    assert len(syncs) == 1  # not once per range
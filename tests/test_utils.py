@@ -4,20 +4,73 @@
 Basic tests for utility helpers.
 """
 
-from youtube_downloader.utils import is_probable_youtube_url, sanitize_filename
+import os
+
+import pytest
+
+from youtube_downloader import utils
+from youtube_downloader.utils import (
+    drop_page_cache,
+    ensure_directory,
+    extract_video_id,
+    is_probable_youtube_url,
+    sanitize_filename,
+)
 
 
 def test_is_probable_youtube_url_accepts_common_forms():
     assert is_probable_youtube_url("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
     assert is_probable_youtube_url("http://youtube.com/watch?v=abcdefg")
     assert is_probable_youtube_url("https://youtu.be/abcdefg12345")
+    assert is_probable_youtube_url("https://m.youtube.com/watch?v=dQw4w9WgXcQ")
 
 
 def test_is_probable_youtube_url_rejects_invalid():
     assert not is_probable_youtube_url("https://example.com/watch?v=dQw4w9WgXcQ")
     assert not is_probable_youtube_url("not-a-url")
+    assert not is_probable_youtube_url("https://youtu.be/abc")
+    assert not is_probable_youtube_url(None)
+
+
+def test_extract_video_id_strips_extra_params():
+    assert extract_video_id("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42s") == "dQw4w9WgXcQ"
+    assert extract_video_id(" https://youtu.be/abcdefg12345?si=xyz ") == "abcdefg12345"
+    assert extract_video_id("https://example.com/watch?v=dQw4w9WgXcQ") is None
 
 
 def test_sanitize_filename_basic():
     assert sanitize_filename("My*Great:Video?") == "My_Great_Video"
     assert sanitize_filename("   ") == "video"
+
+
+def test_sanitize_filename_collapses_runs():
+    assert sanitize_filename("My***Video") == "My_Video"
+    assert sanitize_filename("日本語 title") == "title"
+
+
+def test_ensure_directory_creates_and_caches(tmp_path):
+    target = tmp_path / "a" / "b"
+    first = ensure_directory(target)
+    assert first.is_dir()
+    assert first == target.resolve()
+    assert ensure_directory(target) is first
+
+
+def test_ensure_directory_recreates_deleted_folder(tmp_path):
+    target = tmp_path / "downloads"
+    ensure_directory(target)
+    target.rmdir()
+    assert ensure_directory(target).is_dir()
+
+
+@pytest.mark.skipif(not hasattr(os, "posix_fadvise"), reason="posix_fadvise unavailable")
+def test_drop_page_cache_syncs_only_on_request(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(utils.os, "fdatasync", lambda fd: calls.append("sync"))
+    monkeypatch.setattr(utils.os, "posix_fadvise", lambda *args: calls.append("advise"))
+    with open(tmp_path / "f.bin", "wb") as f:
+        f.write(b"x" * 4096)
+        drop_page_cache(f.fileno(), 0, 4096)
+        assert calls == ["advise"]
+        drop_page_cache(f.fileno(), sync=True)
+    assert calls == ["advise", "sync", "advise"]